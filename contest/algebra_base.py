@@ -25,15 +25,21 @@ class Group(Generic[T]):
     def true_div(self, x: T, y: T) -> T:
         return self.mul(x, self.inv(y))
 
+    def sqr(self, x: T) -> T:
+        return self.mul(x, x)
+
     def pow(self, x: T, ord: int) -> T:
         if ord == 0:
             return self.unit()
         elif ord < 0:
             return self.pow(self.inv(x), -ord)
-        elif ord % 2 == 0:
-            return self.pow(self.mul(x, x), ord / 2)
-        else:
-            return self.mul(self.pow(x, ord - 1), x)
+        # Starting from the unit keeps the result reduced even for ord == 1.
+        result = self.unit()
+        for bit in bin(ord)[2:]:
+            result = self.sqr(result)
+            if bit == '1':
+                result = self.mul(result, x)
+        return result
 
 
 class Field(Group[T]):
@@ -63,9 +69,11 @@ class GcdMixin(Field[T]):
         old_t, t = self.zero(), self.unit()
         while not self.is_zero(r):
             quot = self.div(old_r, r)
-            old_r, r = r, self.sub(old_r, self.mul(quot, r))
-            old_s, s = s, self.sub(old_s, self.mul(quot, s))
-            old_r, t = t, self.sub(old_t, self.mul(quot, t))
+            new_r = self.into(self.sub(old_r, self.mul(quot, r)))
+            new_s = self.into(self.sub(old_s, self.mul(quot, s)))
+            new_t = self.into(self.sub(old_t, self.mul(quot, t)))
+            old_r, old_s, old_t = r, s, t
+            r, s, t = new_r, new_s, new_t
         return old_r, old_s, old_t
 
 
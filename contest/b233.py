@@ -0,0 +1,6 @@
+modulo = 2 ** 233 + 2 ** 74 + 1
+a = 1
+b = 0x066647ede6c332c7f8c0923bb58213b333b20e9ce4281fe115f7d8f90ad
+gx = 0x0fac9dfcbac8313bb2139f1bb755fef65bc391f8b36f8f8eb7371fd558b
+gy = 0x1006a08a41903350678e58528bebf8a0beff867a7ca36716f7e01f81052
+order = 0x1000000000000000000000000000013e974e72f8a6922031d2603cfe0d7
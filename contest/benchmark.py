@@ -0,0 +1,208 @@
+from random import randrange
+from sys import argv
+from timeit import timeit
+from algebra_base import GcdMixin
+from prime_fields import Zn
+from polynomial import Fp
+from bitsize import BinaryPoly
+from binary_curve import BinaryCurve, BinaryE
+from elliptic_curve import Curve, E, SolvableCurve
+from elliptic_curve_generator import PointCounter, group_order, np
+from samples import binary_elliptic_el_gamal
+from encoders import from_digits, to_digits
+import b233
+import p256
+
+
+def best_of(f, number, repeat=3):
+    return min(timeit(f, number=number) for _ in range(repeat)) / number
+
+
+def bench_fp_mul():
+    p = 1000003
+    field = Fp(Zn(p), [1, 1])
+    # Only the top-level step is forced, recursion follows the thresholds.
+    modes = {
+        'schoolbook': field._schoolbook,
+        'karatsuba': field._karatsuba,
+        'toom3': field._toom3,
+    }
+    print('deg', *modes, sep='\t')
+    wins = {'karatsuba': [], 'toom3': []}
+    for n in [8, 16, 24, 32, 48, 64, 96, 128, 192, 256, 384, 512]:
+        x = [randrange(p) for _ in range(n)]
+        y = [randrange(p) for _ in range(n)]
+        row = {name: best_of(lambda: mul(x, y), max(1, 2000 // n))
+               for name, mul in modes.items()}
+        print(n, *('{:.2e}'.format(t) for t in row.values()), sep='\t')
+        wins['karatsuba'].append((n, row['karatsuba'] < row['schoolbook']))
+        wins['toom3'].append((n, row['toom3'] < row['karatsuba']))
+    print('crossover:', {name: crossover(w) for name, w in wins.items()})
+    print('configured:', Fp.karatsuba_threshold, Fp.toom3_threshold)
+
+
+def crossover(wins):
+    result = None
+    for n, win in reversed(wins):
+        if not win:
+            break
+        result = n
+    return result
+
+
+def bench_fp_pow():
+    print('p', 'frobenius', 'binary', 'itoh-tsujii', 'euclid', sep='\t')
+    for p, f in [(3989, [31, 2597, 2121, 1]), (1000003, [3, 0, 0, 0, 0, 1])]:
+        field, plain = Fp(Zn(p), f), Fp(Zn(p), f)
+        plain.use_frobenius = False
+        n = len(f) - 1
+        x = field.into([randrange(p) for _ in range(n)])
+        e = randrange(field.order())
+        row = [
+            best_of(lambda: field.pow(x, e), 20),
+            best_of(lambda: plain.pow(x, e), 20),
+            best_of(lambda: field.inv(x), 100),
+            best_of(lambda: plain.inv(x), 100),
+        ]
+        print(p, *('{:.2e}'.format(t) for t in row), sep='\t')
+
+
+def bench_fp_gcd():
+    p = 1000003
+    print('deg', 'half-gcd', 'euclid', sep='\t')
+    for n in [32, 64, 128, 256, 512]:
+        f = [randrange(p) for _ in range(n)] + [1]
+        field = Fp(Zn(p), f)
+        x = [randrange(p) for _ in range(n - 1)] + [1]
+        row = [
+            best_of(lambda: field.gcd(x, f), 1),
+            best_of(lambda: GcdMixin.gcd(field, x, f), 1),
+        ]
+        print(n, *('{:.2e}'.format(t) for t in row), sep='\t')
+
+
+def bench_binary_into():
+    moduli = {
+        163: (1 << 163) | (1 << 7) | (1 << 6) | (1 << 3) | 1,
+        233: (1 << 233) | (1 << 74) | 1,
+    }
+    print('deg', 'fold', 'bitwise', sep='\t')
+    for m, modulo in moduli.items():
+        field = BinaryPoly(modulo)
+        xs = [randrange(1 << (2 * m - 1)) for _ in range(100)]
+        row = [
+            best_of(lambda: [field.into(x) for x in xs], 20),
+            best_of(lambda: [field._into_bitwise(x) for x in xs], 20),
+        ]
+        print(m, *('{:.2e}'.format(t / len(xs)) for t in row), sep='\t')
+
+
+def bench_binary_inv():
+    moduli = {
+        163: (1 << 163) | (1 << 7) | (1 << 6) | (1 << 3) | 1,
+        233: (1 << 233) | (1 << 74) | 1,
+        571: (1 << 571) | (1 << 10) | (1 << 5) | (1 << 2) | 1,
+    }
+    print('deg', 'eea', 'batch', 'itoh-tsujii', 'euclid', sep='\t')
+    for m, modulo in moduli.items():
+        field = BinaryPoly(modulo)
+        xs = [randrange(1, 1 << m) for _ in range(100)]
+        row = [
+            best_of(lambda: [field.inv(x) for x in xs], 5),
+            best_of(lambda: field.inv_many(xs), 5),
+            best_of(lambda: [field.inv_itoh_tsujii(x) for x in xs], 5),
+            best_of(lambda: [GcdMixin.gcd(field, x, modulo) for x in xs], 5),
+        ]
+        print(m, *('{:.2e}'.format(t / len(xs)) for t in row), sep='\t')
+
+
+def bench_ec_pow():
+    prime = E(p256.order, Curve(Zn(p256.p), p256.a, p256.b))
+    binary = BinaryE(b233.order, BinaryCurve(BinaryPoly(b233.modulo), b233.a, b233.b))
+    groups = {
+        'p256': (prime, prime.curve.point(p256.gx, p256.gy)),
+        'b233': (binary, binary.curve.point(b233.gx, b233.gy)),
+    }
+    print('curve', 'pow', sep='\t')
+    for name, (group, g) in groups.items():
+        e = randrange(group.order())
+        print(name, '{:.2e}'.format(best_of(lambda: group.pow(g, e), 3)), sep='\t')
+    el_gamal = binary_elliptic_el_gamal(*groups['b233'])
+    x = randrange(b233.order)
+    h = binary.pow(groups['b233'][1], x)
+    message = 'x' * el_gamal.encoder.primary.chunk_length
+    row = [
+        best_of(lambda: el_gamal.encrypt(h, message), 3),
+        best_of(lambda: el_gamal.decrypt(x, el_gamal.encrypt(h, message)), 3),
+    ]
+    print('block', 'encrypt', 'roundtrip', sep='\t')
+    print('b233', *('{:.2e}'.format(t) for t in row), sep='\t')
+
+
+def bench_point_count():
+    print('p', 'numpy row', 'python row', sep='\t')
+    for p in [1019, 2027, 4099]:
+        counter, plain = PointCounter(p), PointCounter(p)
+        plain.vectorized = False
+        a = randrange(1, p)
+        numpy_row = best_of(lambda: counter.count_row(a), 1) if np is not None else None
+        python_row = best_of(lambda: [plain.count(a, b) for b in range(p)], 1)
+        print(p, *('-' if t is None else '{:.2e}'.format(t) for t in [numpy_row, python_row]),
+              sep='\t')
+
+
+def bench_group_order():
+    print('p', 'bsgs', 'count', sep='\t')
+    for p in [100003, 100057, 1000000007, 1000000009, 1000000000039, 1000000000061]:
+        curve = SolvableCurve(Zn(p), randrange(p), randrange(p))
+        bsgs = best_of(lambda: group_order(curve), 3)
+        count = best_of(lambda: PointCounter(p).count(curve.a, curve.b), 1) if p < 10 ** 7 else None
+        print(p, *('-' if t is None else '{:.2e}'.format(t) for t in [bsgs, count]), sep='\t')
+
+
+def loop_digits(n, base):
+    result = []
+    while n != 0:
+        result.append(n % base)
+        n //= base
+    return result
+
+
+def horner(digits, base):
+    n = 0
+    for d in reversed(digits):
+        n = n * base + d
+    return n
+
+
+def bench_radix():
+    base = 1000003
+    print('bits', 'split', 'loop', 'tree', 'horner', sep='\t')
+    for bits in [1 << 14, 1 << 16, 1 << 18, 1 << 20]:
+        n = randrange(1 << bits)
+        digits = to_digits(n, base)
+        row = [
+            best_of(lambda: to_digits(n, base), 1),
+            best_of(lambda: loop_digits(n, base), 1),
+            best_of(lambda: from_digits(digits, base), 1),
+            best_of(lambda: horner(digits, base), 1),
+        ]
+        print(bits, *('{:.2e}'.format(t) for t in row), sep='\t')
+
+
+BENCHMARKS = {
+    'fp_mul': bench_fp_mul,
+    'fp_pow': bench_fp_pow,
+    'fp_gcd': bench_fp_gcd,
+    'binary_into': bench_binary_into,
+    'binary_inv': bench_binary_inv,
+    'ec_pow': bench_ec_pow,
+    'point_count': bench_point_count,
+    'group_order': bench_group_order,
+    'radix': bench_radix,
+}
+
+if __name__ == '__main__':
+    for name in argv[1:] or BENCHMARKS:
+        print('==', name)
+        BENCHMARKS[name]()
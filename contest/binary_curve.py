@@ -0,0 +1,157 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from algebra_base import Group
+from bitsize import BinaryPoly
+from elliptic_curve import Point, Zero, NotOnCurve
+from encoders import Encoder
+from random import randrange
+
+
+# y^2 + xy = x^3 + ax^2 + b in Lopez-Dahab coordinates: the affine point
+# (x, y) is (X : Y : Z) with x = X / Z and y = Y / Z^2.
+@dataclass
+class BinaryCurve:
+    field: BinaryPoly
+    a: int
+    b: int
+
+    def point(self, x: int, y: int, z: int = 1) -> Point:
+        p = Point(self.field.into(x), self.field.into(y), self.field.into(z))
+        assert self.check(p)
+        return p
+
+    def rhs(self, x: int, z: int = 1) -> int:
+        f = self.field
+        z2 = f.sqr(z)
+        return f.mul(f.mul(f.sqr(x), x), z) ^ f.mul(self.a, f.mul(f.sqr(x), z2)) ^ f.mul(self.b, f.sqr(z2))
+
+    def check(self, p: Point) -> bool:
+        f = self.field
+        x, y, z = p.unpack()
+        return f.sqr(y) ^ f.mul(f.mul(x, y), z) == self.rhs(x, z)
+
+    def intern(self, p: Point) -> Tuple[int, int]:
+        if p.z == 0:
+            raise Zero
+        else:
+            z = self.field.inv(p.z)
+            return self.field.mul(p.x, z), self.field.mul(p.y, self.field.sqr(z))
+
+    def solve_for_x(self, x: int) -> Optional[Point]:
+        f = self.field
+        x = f.into(x)
+        if x == 0:
+            return self.point(0, f.frobenius(self.b, f.degree - 1))
+        # With y = xw the equation becomes w^2 + w = rhs / x^2.
+        c = f.mul(self.rhs(x), f.inv(f.sqr(x)))
+        w = self.half_trace(c)
+        if f.sqr(w) ^ w != c:
+            return None
+        return self.point(x, f.mul(x, w))
+
+    def half_trace(self, c: int) -> int:
+        f = self.field
+        assert f.degree % 2 == 1
+        result = c
+        for _ in range(f.degree // 2):
+            c = f.frobenius(c, 2)
+            result ^= c
+        return result
+
+    def asserted(self, x: int) -> Point:
+        p = self.solve_for_x(x)
+        if p is None:
+            raise NotOnCurve
+        else:
+            return p
+
+
+@dataclass
+class BinaryE(Group[Point]):
+    ord: int
+    curve: BinaryCurve
+
+    def order(self):
+        return self.ord
+
+    def into(self, a):
+        return self.curve.point(*a.unpack())
+
+    def unit(self):
+        return Point(1, 0, 0)
+
+    def is_unit(self, a: Point) -> bool:
+        return a.z == 0
+
+    def inv(self, a):
+        return Point(a.x, self.curve.field.mul(a.x, a.z) ^ a.y, a.z)
+
+    def eq(self, a, b):
+        f = self.curve.field
+        if self.is_unit(a) or self.is_unit(b):
+            return self.is_unit(a) and self.is_unit(b)
+        return (f.mul(a.x, b.z) == f.mul(b.x, a.z) and
+                f.mul(a.y, f.sqr(b.z)) == f.mul(b.y, f.sqr(a.z)))
+
+    def sqr(self, a):
+        if self.is_unit(a):
+            return a
+        f = self.curve.field
+        x, y, z = a.unpack()
+        x2, z2 = f.sqr(x), f.sqr(z)
+        bz4 = f.mul(self.curve.b, f.sqr(z2))
+        new_z = f.mul(x2, z2)
+        if new_z == 0:
+            return self.unit()
+        new_x = f.sqr(x2) ^ bz4
+        new_y = f.mul(bz4, new_z) ^ f.mul(new_x, f.mul(self.curve.a, new_z) ^ f.sqr(y) ^ bz4)
+        return Point(new_x, new_y, new_z)
+
+    def mul(self, a, b):
+        if self.is_unit(a):
+            return b
+        elif self.is_unit(b):
+            return a
+        f = self.curve.field
+        z1, z2 = a.z, b.z
+        z1_sq, z2_sq = f.sqr(z1), f.sqr(z2)
+        u = f.mul(a.y, z2_sq) ^ f.mul(b.y, z1_sq)
+        v = f.mul(a.x, z2) ^ f.mul(b.x, z1)
+        if v == 0:
+            return self.sqr(a) if u == 0 else self.unit()
+        # lambda = u / (v z1 z2), and the result is scaled so that Z = (v z1 z2)^2.
+        w = f.mul(v, f.mul(z1, z2))
+        v_sq = f.sqr(v)
+        new_x = f.sqr(u) ^ f.mul(u, w) ^ f.mul(v_sq, w) ^ f.mul(self.curve.a, f.sqr(w))
+        e = f.mul(v_sq, f.mul(z1, z2_sq))
+        d = f.mul(a.x, e) ^ new_x
+        new_y = f.mul(w, f.mul(u, d) ^ f.mul(new_x, w)) ^ f.mul(a.y, f.sqr(e))
+        return Point(new_x, new_y, f.sqr(w))
+
+
+class BinaryRandomEncoder(Encoder[Point]):
+    def __init__(self, primary: Encoder[int], curve: BinaryCurve, rand_shift: int):
+        self.primary = primary
+        self.curve = curve
+        self.rand_shift = rand_shift
+
+    def encode(self, text):
+        nums = self.primary.encode(text)
+        return [self.encode_one(num) for num in nums]
+
+    def decode(self, code):
+        nums = [self.decode_one(code) for code in code]
+        return self.primary.decode(nums)
+
+    def encode_one(self, num: int) -> Point:
+        while True:
+            point = self.curve.solve_for_x(num | self.random())
+            if point is not None:
+                return point
+
+    def random(self) -> int:
+        high = self.curve.field.degree - self.rand_shift
+        return randrange(0, 1 << high) << self.rand_shift
+
+    def decode_one(self, code: Point) -> int:
+        return self.curve.intern(code)[0] & ((1 << self.rand_shift) - 1)
@@ -1,9 +1,27 @@
+from typing import List
 from algebra_base import GcdMixin
 
+# SPREAD[b] is the byte b with a zero bit interleaved after every bit,
+# little-endian, so squaring a polynomial is a byte-wise lookup.
+SPREAD = [sum(((b >> i) & 1) << (2 * i) for i in range(8)).to_bytes(2, 'little')
+          for b in range(256)]
+
 
 class BinaryPoly(GcdMixin[int]):
+    sparse_terms = 4
+
     def __init__(self, modulo: int):
         self.modulo = modulo
+        self.degree = modulo.bit_length() - 1
+        self.mask = (1 << self.degree) - 1
+        low = modulo & self.mask
+        terms = [i for i in range(low.bit_length()) if (low >> i) & 1]
+        # Trinomials and pentanomials whose middle terms sit in the lower
+        # half fold the high part back in a couple of shifted XORs.
+        if len(terms) <= self.sparse_terms and 2 * low.bit_length() <= self.degree + 1:
+            self.fold_terms = terms
+        else:
+            self.fold_terms = None
 
     def add(self, x, y):
         return x ^ y
@@ -18,6 +36,17 @@ class BinaryPoly(GcdMixin[int]):
         return 0
 
     def into(self, x):
+        if self.fold_terms is None:
+            return self._into_bitwise(x)
+        n, mask = self.degree, self.mask
+        while x >> n:
+            high = x >> n
+            x &= mask
+            for k in self.fold_terms:
+                x ^= high << k
+        return x
+
+    def _into_bitwise(self, x: int) -> int:
         while True:
             shift = x.bit_length() - self.modulo.bit_length()
             if shift < 0:
@@ -42,15 +71,73 @@ class BinaryPoly(GcdMixin[int]):
         return 1 << (self.modulo.bit_length() - 1)
 
     def mul(self, x, y):
+        return self.into(self.clmul(x, y))
+
+    def clmul(self, x: int, y: int) -> int:
+        w = 4 if x.bit_length() < 1024 else 8
+        # table[t] is the carry-less product y * t for every w-bit t.
+        table = [0, y]
+        for t in range(2, 1 << w):
+            table.append(table[t >> 1] << 1 if t % 2 == 0 else table[t - 1] ^ y)
+        mask = (1 << w) - 1
         result = 0
-        for i in range(x.bit_length()):
-            result ^= y * (x & (1 << i))
+        for shift in range((x.bit_length() - 1) // w * w, -1, -w):
+            result = (result << w) ^ table[(x >> shift) & mask]
         return result
 
+    def sqr(self, x):
+        return self.into(self.spread(x))
+
+    def spread(self, x: int) -> int:
+        data = x.to_bytes((x.bit_length() + 7) // 8, 'little')
+        return int.from_bytes(b''.join(SPREAD[b] for b in data), 'little')
+
+    def frobenius(self, x: int, k: int = 1) -> int:
+        for _ in range(k):
+            x = self.sqr(x)
+        return x
+
     def unit(self):
         return 1
 
     def inv(self, x):
-        gcd, x, _ = self.gcd(x, self.modulo)
-        assert gcd == 1
-        return x
+        # Binary extended Euclid: cancel the leading term of u with a shifted
+        # v, keeping g1 * x == u and g2 * x == v modulo the modulus.
+        u, v, g1, g2 = x, self.modulo, 1, 0
+        while u > 1:
+            j = u.bit_length() - v.bit_length()
+            if j < 0:
+                u, v, g1, g2, j = v, u, g2, g1, -j
+            u ^= v << j
+            g1 ^= g2 << j
+        # u reaches 0 instead when x and the modulus share a factor.
+        assert u == 1
+        return g1
+
+    def inv_many(self, xs: List[int]) -> List[int]:
+        # Montgomery's trick: one inversion and 3(n - 1) multiplications.
+        prefix = [1]
+        for x in xs:
+            prefix.append(self.mul(prefix[-1], x))
+        acc = self.inv(prefix[-1])
+        result = [0] * len(xs)
+        for i in range(len(xs) - 1, -1, -1):
+            result[i] = self.mul(acc, prefix[i])
+            acc = self.mul(acc, xs[i])
+        return result
+
+    def inv_itoh_tsujii(self, x: int) -> int:
+        assert x != 0
+        if self.degree == 1:
+            return x
+        # Itoh-Tsujii: x^-1 = (x^(2^(m-1) - 1))^2, building x^(2^k - 1)
+        # along the bits of m - 1 with one mul per doubling or increment.
+        n = self.degree - 1
+        beta, k = x, 1
+        for bit in bin(n)[3:]:
+            beta = self.mul(self.frobenius(beta, k), beta)
+            k *= 2
+            if bit == '1':
+                beta = self.mul(self.sqr(beta), x)
+                k += 1
+        return self.sqr(beta)
@@ -0,0 +1,41 @@
+from random import randrange
+from sys import argv, exit
+from typing import List
+from polynomial import Fp, FpTable
+from prime_fields import Zn
+from param_store import read_polys
+
+
+# Compares the log-table field against plain polynomial arithmetic on every
+# field of the given poly files that is small enough for a table.
+def check_table(p: int, modulo: List[int], g: List[int], samples: int = 100) -> int:
+    plain, table = Fp(Zn(p), modulo), FpTable(Zn(p), modulo)
+    n = len(modulo) - 1
+    errors = 0
+    for _ in range(samples):
+        x = [randrange(p) for _ in range(n)]
+        y = [randrange(p) for _ in range(n)]
+        e = randrange(-table.order(), table.order())
+        tx, ty = table.pack(x), table.pack(y)
+        checks = [
+            (table.mul(tx, ty), plain.mul(plain.into(x), plain.into(y))),
+            (table.add(tx, ty), plain.add(plain.into(x), plain.into(y))),
+        ]
+        if not plain.is_zero(plain.into(g)):
+            checks.append((table.pow(table.pack(g), e), plain.pow(plain.into(g), e)))
+        errors += sum(not plain.eq(table.unpack(t), f) for t, f in checks)
+    return errors
+
+
+if __name__ == '__main__':
+    failed = False
+    for path in argv[1:] or ['../poly1.txt']:
+        with open(path) as f:
+            for p, modulo, g in read_polys(f):
+                if p ** (len(modulo) - 1) > FpTable.max_order:
+                    continue
+                errors = check_table(p, modulo, g)
+                if errors:
+                    failed = True
+                    print(path, p, *modulo, 'mismatches:', errors)
+    exit(1 if failed else 0)
@@ -0,0 +1,168 @@
+from dataclasses import dataclass
+from mmap import mmap, ACCESS_READ
+from struct import Struct
+from sys import argv, exit, stdin, stdout
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+from elliptic_curve import Point, SolvableCurve
+from encoders import align
+from prime_fields import Zn
+import p256
+
+MAGIC = b'EGC2'
+# Magic, group kind, slots per element, element width in bytes, the length
+# of the preamble and the number of (c1, c2) records that follow, each two
+# elements wide. The preamble keeps the parameter lines of the text format.
+HEADER = Struct('<4sBHHII')
+PRIME, POLY, CURVE = 0, 1, 2
+KINDS = {'prime': PRIME, 'poly': POLY, 'p256': CURVE}
+# Parameter lines before the elements: "p k" for prime groups, p, the
+# modulus and k for polynomials, and s, n for curves.
+PREAMBLE_LINES = {PRIME: 1, POLY: 3, CURVE: 2}
+
+
+@dataclass
+class Layout:
+    kind: int
+    slots: int
+    width: int
+    curve: Optional[SolvableCurve] = None
+
+    def pack(self, x) -> bytes:
+        if self.kind == PRIME:
+            return x.to_bytes(self.width, 'big')
+        elif self.kind == POLY:
+            if len(x) > self.slots:
+                raise ValueError('{} coefficients do not fit {} slots'.format(len(x), self.slots))
+            w = self.width // self.slots
+            return b''.join(c.to_bytes(w, 'big') for c in align(x, self.slots))
+        else:
+            return self.curve.compress(x)
+
+    def unpack(self, data: bytes):
+        if self.kind == PRIME:
+            return int.from_bytes(data, 'big')
+        elif self.kind == POLY:
+            w = self.width // self.slots
+            return [int.from_bytes(data[i:i + w], 'big') for i in range(0, self.width, w)]
+        elif self.curve is None:
+            return bytes(data)
+        else:
+            return self.curve.decompress(data)
+
+
+def int_width(p: int) -> int:
+    return (p.bit_length() + 7) // 8
+
+
+def prime_layout(p: int) -> Layout:
+    return Layout(PRIME, 1, int_width(p))
+
+
+def poly_layout(p: int, n: int) -> Layout:
+    return Layout(POLY, n, n * int_width(p))
+
+
+def curve_layout(curve: SolvableCurve) -> Layout:
+    return Layout(CURVE, 1, curve.compressed_width(), curve)
+
+
+def p256_curve() -> SolvableCurve:
+    return SolvableCurve(Zn(p256.p), p256.a, p256.b)
+
+
+def layout_for(kind: int, preamble: List[str]) -> Layout:
+    if kind == PRIME:
+        return prime_layout(int(preamble[0].split()[0]))
+    elif kind == POLY:
+        return poly_layout(int(preamble[0]), len(preamble[1].split()) - 1)
+    else:
+        return curve_layout(p256_curve())
+
+
+def write_cipher(out: BinaryIO, layout: Layout, cipher: List[Tuple], preamble: List[str] = ()):
+    text = '\n'.join(preamble).encode('utf-8')
+    out.write(HEADER.pack(MAGIC, layout.kind, layout.slots, layout.width, len(text), len(cipher)))
+    out.write(text)
+    for c1, c2 in cipher:
+        out.write(layout.pack(c1))
+        out.write(layout.pack(c2))
+
+
+def read_preamble(path: str) -> Tuple[int, List[str]]:
+    with open(path, 'rb') as f:
+        magic, kind, _, _, size, _ = HEADER.unpack(f.read(HEADER.size))
+        assert magic == MAGIC
+        text = f.read(size).decode('utf-8')
+    return kind, text.split('\n') if text else []
+
+
+def read_cipher(path: str, curve: Optional[SolvableCurve] = None) -> Iterator[Tuple]:
+    # Records are decoded straight from the mapping, one at a time.
+    with open(path, 'rb') as f, mmap(f.fileno(), 0, access=ACCESS_READ) as data:
+        magic, kind, slots, width, size, count = HEADER.unpack_from(data, 0)
+        assert magic == MAGIC
+        layout = Layout(kind, slots, width, curve)
+        offset = HEADER.size + size
+        for _ in range(count):
+            yield (layout.unpack(data[offset:offset + width]),
+                   layout.unpack(data[offset + width:offset + 2 * width]))
+            offset += 2 * width
+
+
+# The text formats of the contest scripts: the preamble lines, then "c1 c2"
+# lines for prime groups, one line of coefficients per element for
+# polynomials and one "x y" (or "Z" for infinity) line per point for curves.
+def parse_text(lines: Iterable[str], kind: int) -> Tuple[Layout, List[str], List[Tuple]]:
+    lines = [line.strip() for line in lines if line.strip()]
+    count = PREAMBLE_LINES[kind]
+    if len(lines) < count:
+        raise ValueError('missing parameter lines')
+    preamble, lines = lines[:count], lines[count:]
+    layout = layout_for(kind, preamble)
+    if kind == PRIME:
+        cipher = [tuple(map(int, line.split())) for line in lines]
+        if any(len(c) != 2 for c in cipher):
+            raise ValueError('expected "c1 c2" lines')
+        return layout, preamble, cipher
+    elif kind == POLY:
+        elements = [list(map(int, line.split())) for line in lines]
+    else:
+        curve = layout.curve
+        f = curve.field
+        elements = [Point(f.zero(), f.unit(), f.zero()) if line == 'Z'
+                    else curve.point(*map(int, line.split())) for line in lines]
+    if len(elements) % 2 != 0:
+        raise ValueError('odd number of elements')
+    return layout, preamble, list(zip(elements[::2], elements[1::2]))
+
+
+def format_text(cipher: Iterable[Tuple], layout: Layout, preamble: List[str] = ()) -> Iterator[str]:
+    yield from preamble
+    for c1, c2 in cipher:
+        if layout.kind == PRIME:
+            yield '{} {}'.format(c1, c2)
+        elif layout.kind == POLY:
+            yield ' '.join(map(str, c1))
+            yield ' '.join(map(str, c2))
+        else:
+            for c in c1, c2:
+                if layout.curve.field.is_zero(c.z):
+                    yield 'Z'
+                else:
+                    yield '{} {}'.format(*layout.curve.intern(c))
+
+
+USAGE = '''usage: python ciphertext.py to-binary prime|poly|p256 < text > binary
+       python ciphertext.py to-text FILE > text'''
+
+if __name__ == '__main__':
+    if len(argv) == 3 and argv[1] == 'to-binary' and argv[2] in KINDS:
+        layout, preamble, cipher = parse_text(stdin, KINDS[argv[2]])
+        write_cipher(stdout.buffer, layout, cipher, preamble)
+    elif len(argv) == 3 and argv[1] == 'to-text':
+        kind, preamble = read_preamble(argv[2])
+        layout = layout_for(kind, preamble)
+        for line in format_text(read_cipher(argv[2], layout.curve), layout, preamble):
+            print(line)
+    else:
+        exit(USAGE)
@@ -1,17 +1,21 @@
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import Generic, Iterable, Iterator, List, Optional, Tuple, TypeVar
 from algebra_base import Group, Field, SqrtField
 from encoders import Encoder
+from polynomial import Fp, fast_field
+from prime_fields import Zn
 from random import randrange
 
+T = TypeVar('T')
+
 
 @dataclass
-class Point:
-    x: int
-    y: int
-    z: int
+class Point(Generic[T]):
+    x: T
+    y: T
+    z: T
 
-    def unpack(self) -> Tuple[int, int, int]:
+    def unpack(self) -> Tuple[T, T, T]:
         return self.x, self.y, self.z
 
 
@@ -20,25 +24,32 @@ class Zero(Exception):
 
 
 @dataclass
-class Curve:
-    field: Field[int]
-    a: int
-    b: int
-
-    def point(self, x: int, y: int, z: int = 1) -> Point:
+class Curve(Generic[T]):
+    field: Field[T]
+    a: T
+    b: T
+
+    def point(self, x: T, y: T, z: Optional[T] = None) -> Point[T]:
+        if z is None:
+            z = self.field.unit()
         p = Point(self.field.into(x), self.field.into(y), self.field.into(z))
         assert self.check(p)
         return p
 
-    def rhs(self, x: int, z: int = 1) -> int:
-        return x ** 3 + self.a * x * z ** 2 + self.b * z ** 3
+    def rhs(self, x: T, z: Optional[T] = None) -> T:
+        f = self.field
+        if z is None:
+            z = f.unit()
+        z2 = f.sqr(z)
+        return f.add(f.add(f.mul(f.sqr(x), x), f.mul(self.a, f.mul(x, z2))),
+                     f.mul(self.b, f.mul(z2, z)))
 
-    def check(self, p: Point) -> bool:
+    def check(self, p: Point[T]) -> bool:
         x, y, z = p.unpack()
-        return self.field.eq(y ** 2 * z, self.rhs(x, z))
+        return self.field.eq(self.field.mul(self.field.sqr(y), z), self.rhs(x, z))
 
-    def intern(self, p: Point) -> Tuple[int, int]:
-        if p.z == 0:
+    def intern(self, p: Point[T]) -> Tuple[T, T]:
+        if self.field.is_zero(p.z):
             raise Zero
         else:
             z = self.field.inv(p.z)
@@ -49,11 +60,11 @@ class NotOnCurve(Exception):
     pass
 
 
-class SolvableCurve(Curve):
-    def __init__(self, field: SqrtField[int], a: int, b: int):
+class SolvableCurve(Curve[T]):
+    def __init__(self, field: SqrtField[T], a: T, b: T):
         super().__init__(field, a, b)
 
-    def solve_for_x(self, x: int) -> Optional[Point]:
+    def solve_for_x(self, x: T) -> Optional[Point[T]]:
         y_sq = self.field.into(self.rhs(x))
         y = self.field.sqrt(y_sq)
         if y is not None:
@@ -61,18 +72,45 @@ class SolvableCurve(Curve):
         else:
             return None
 
-    def asserted(self, x: int) -> Point:
+    def asserted(self, x: T) -> Point[T]:
         p = self.solve_for_x(x)
         if p is None:
             raise NotOnCurve
         else:
             return p
 
+    # SEC 1 style: a 0x02/0x03 tag for the parity of y, then x big-endian;
+    # the point at infinity is all zero bytes of the same width.
+    def compressed_width(self) -> int:
+        return (self.field.order().bit_length() + 7) // 8 + 1
+
+    def compress(self, p: Point[int]) -> bytes:
+        width = self.compressed_width()
+        if self.field.is_zero(p.z):
+            return bytes(width)
+        x, y = self.intern(p)
+        return bytes([2 + y % 2]) + x.to_bytes(width - 1, 'big')
+
+    def decompress(self, data: bytes) -> Point[int]:
+        if len(data) != self.compressed_width() or data[0] not in (0, 2, 3):
+            raise ValueError('not a compressed point')
+        if data[0] == 0:
+            if any(data[1:]):
+                raise ValueError('nonzero payload for the point at infinity')
+            return Point(self.field.zero(), self.field.unit(), self.field.zero())
+        x = int.from_bytes(data[1:], 'big')
+        if x >= self.field.order():
+            raise ValueError('x out of range')
+        p = self.asserted(x)
+        if p.y % 2 != data[0] - 2:
+            p = Point(p.x, self.field.neg(p.y), p.z)
+        return p
+
 
 @dataclass
-class E(Group[Point]):
+class E(Group[Point[T]]):
     ord: int
-    curve: Curve
+    curve: Curve[T]
 
     def order(self):
         return self.ord
@@ -81,19 +119,23 @@ class E(Group[Point]):
         return self.curve.point(*a.unpack())
 
     def unit(self):
-        return Point(0, 1, 0)
+        f = self.curve.field
+        return Point(f.zero(), f.unit(), f.zero())
 
-    def is_unit(self, a: Point) -> bool:
-        return a.z == 0
+    def is_unit(self, a: Point[T]) -> bool:
+        return self.curve.field.is_zero(a.z)
 
     def inv(self, a):
         return Point(a.x, self.curve.field.neg(a.y), a.z)
 
     def eq(self, a, b):
-        eq = self.curve.field.eq
-        return eq(a.x * b.z, a.z * b.x) and eq(a.y * b.z, a.z * b.y)
+        f = self.curve.field
+        return (f.eq(f.mul(a.x, b.z), f.mul(a.z, b.x)) and
+                f.eq(f.mul(a.y, b.z), f.mul(a.z, b.y)))
 
     def mul(self, a, b):
+        f = self.curve.field
+        add, sub, mul, sqr = f.add, f.sub, f.mul, f.sqr
         if self.is_unit(a):
             return b
         elif self.is_unit(b):
@@ -102,25 +144,36 @@ class E(Group[Point]):
             return self.unit()
         elif self.eq(a, b):
             x, y, z = a.unpack()
-            q = 2 * y * z
-            n = 3 * x ** 2 + self.curve.a * z ** 2
-            p = 4 * x * y ** 2 * z
-            u = n ** 2 - 2 * p
-            new_x = u * q
-            new_z = q ** 3
-            new_y = n * (p - u) - 8 * y ** 4 * z ** 2
+            yz = mul(y, z)
+            q = add(yz, yz)
+            x2 = sqr(x)
+            n = add(add(x2, add(x2, x2)), mul(self.curve.a, sqr(z)))
+            p = mul(mul(x, y), q)
+            p = add(p, p)
+            u = sub(sqr(n), add(p, p))
+            q2 = sqr(q)
+            r = mul(q2, sqr(y))
+            new_x = mul(u, q)
+            new_z = mul(q2, q)
+            new_y = sub(mul(n, sub(p, u)), add(r, r))
             return self.into(Point(new_x, new_y, new_z))
         else:
-            u = a.z * b.y - a.y * b.z
-            v = a.z * b.x - a.x * b.z
-            w = u ** 2 * a.z * b.z - v ** 3 - 2 * v ** 2 * a.x * b.z
-            new_x = v * w
-            new_y = u * (v ** 2 * a.x * b.z - w) - v ** 3 * a.y * b.z
-            new_z = v ** 3 * a.z * b.z
+            u = sub(mul(a.z, b.y), mul(a.y, b.z))
+            v = sub(mul(a.z, b.x), mul(a.x, b.z))
+            v2 = sqr(v)
+            v3 = mul(v2, v)
+            zz = mul(a.z, b.z)
+            v2x = mul(v2, mul(a.x, b.z))
+            w = sub(sub(mul(sqr(u), zz), v3), add(v2x, v2x))
+            new_x = mul(v, w)
+            new_y = sub(mul(u, sub(v2x, w)), mul(v3, mul(a.y, b.z)))
+            new_z = mul(v3, zz)
             return self.into(Point(new_x, new_y, new_z))
 
 
 class RandomEncoder(Encoder[Point]):
+    batch = 8
+
     def __init__(self, primary: Encoder[int], curve: SolvableCurve, rand_shift: int):
         self.primary = primary
         self.curve = curve
@@ -135,16 +188,23 @@ class RandomEncoder(Encoder[Point]):
         return self.primary.decode(nums)
 
     def encode_one(self, num: int) -> Point:
+        field = self.curve.field
+        p = field.order()
+        # Candidates are screened with the Jacobi symbol, so the square root
+        # is only taken once, for the first x whose right-hand side is a square.
         while True:
-            point = self.curve.solve_for_x(num + self.random())
-            if point is not None:
-                return point
+            for x in [num + self.random() for _ in range(self.batch)]:
+                if x >= p:
+                    continue
+                rhs = field.into(self.curve.rhs(x))
+                if field.jacobi(rhs) >= 0:
+                    return self.curve.point(x, field.sqrt(rhs))
 
     def random(self) -> int:
         return randrange(0, 1 << self.rand_shift) << self.rand_shift
 
     def decode_one(self, code: Point) -> int:
-        return code.x & (1 << self.rand_shift - 1)
+        return self.curve.intern(code)[0] & ((1 << self.rand_shift) - 1)
 
 
 @dataclass
@@ -157,3 +217,60 @@ class PartialEncoder(Encoder[Point]):
 
     def decode(self, code):
         return self.x_enc.decode([ self.curve.intern(p)[0] for p in code ])
+
+
+@dataclass
+class CoefficientEncoder(Encoder[Point]):
+    lists: Encoder[List[int]]
+    curve: SolvableCurve
+    rand_len: int
+
+    def encode(self, text):
+        return [self.encode_one(lst) for lst in self.lists.encode(text)]
+
+    def decode(self, code):
+        field = self.curve.field
+        return self.lists.decode([field.unpack(self.curve.intern(p)[0])[self.rand_len:]
+                                  for p in code])
+
+    def encode_one(self, lst: List[int]) -> Point:
+        field = self.curve.field
+        p = field.over.order()
+        while True:
+            rand = [randrange(p) for _ in range(self.rand_len)]
+            point = self.curve.solve_for_x(field.pack(rand + list(lst)))
+            if point is not None:
+                return point
+
+
+# Blocks of prime, irreducible, a, b and size as printed by main_ell; the
+# polynomials are low-order coefficient first and a zero polynomial is an
+# empty line, so blocks are read by position.
+def read_curves(lines: Iterable[str]) -> Iterator[Tuple[int, List[int], List[int], List[int], int]]:
+    lines = [line.strip() for line in lines]
+    lines = [line for line in lines if not line[:1].isalpha()]
+    while lines and not lines[0]:
+        lines.pop(0)
+    for i in range(0, len(lines) - 4, 6):
+        p, modulo, a, b, size = lines[i:i + 5]
+        yield (int(p), [int(c) for c in modulo.split()], [int(c) for c in a.split()],
+               [int(c) for c in b.split()], int(size))
+
+
+def extension_curve(p: int, modulo: List[int], a: List[int], b: List[int],
+                    size: int) -> Tuple[E, Point]:
+    field = fast_field(Zn(p), modulo, Fp)
+    curve = SolvableCurve(field, field.pack(a), field.pack(b))
+    for index in range(field.order()):
+        g = curve.solve_for_x(field.pack(_digits(index, p)))
+        if g is not None and not field.is_zero(g.y):
+            return E(size, curve), g
+    raise NotOnCurve
+
+
+def _digits(index: int, p: int) -> List[int]:
+    result = []
+    while index != 0:
+        result.append(index % p)
+        index //= p
+    return result
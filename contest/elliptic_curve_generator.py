@@ -1,6 +1,18 @@
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from math import isqrt
+from os import getpid
+from random import randrange
+from sys import stderr
+from time import perf_counter
+from typing import List, Optional, Tuple
 from elliptic_curve import SolvableCurve, E, Point
 from prime_fields import Zn
+from primes import prime_factors, primes_in
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 def curve_params(p, a, b):
     f = Zn(p)
@@ -22,18 +34,42 @@ def curve_params(p, a, b):
         return g, n
 
 
-def sieve(n):
-    lp = [0] * (n + 1)
-    pr = []
-    for i in range(2, n + 1):
-        if lp[i] == 0:
-            lp[i] = i
-            pr.append(i)
-        for p in pr:
-            if p > lp[i] or p * i > n:
-                break
-            lp[p * i] = p
-    return pr
+# #E(a, b) = p + 1 + sum of chi(x^3 + ax + b) over x, with chi the quadratic
+# character. With NumPy a whole row of b is counted at once for each a.
+class PointCounter:
+    chunk = 1 << 22
+
+    def __init__(self, p: int):
+        self.p = p
+        self.chi = [-1] * p
+        self.chi[0] = 0
+        for x in range(1, p):
+            self.chi[x * x % p] = 1
+        self.x3 = [x * x * x % p for x in range(p)]
+        self.vectorized = np is not None
+        if self.vectorized:
+            self.chi_array = np.array(self.chi, dtype=np.int8)
+            self.x3_array = np.array(self.x3, dtype=np.int64)
+            self.x_array = np.arange(p, dtype=np.int64)
+
+    def count(self, a: int, b: int) -> int:
+        p = self.p
+        if not self.vectorized:
+            chi = self.chi
+            return p + 1 + sum(chi[(x3 + a * x + b) % p] for x, x3 in enumerate(self.x3))
+        r = (self.x3_array + a * self.x_array + b) % p
+        return p + 1 + int(self.chi_array[r].sum(dtype=np.int64))
+
+    def count_row(self, a: int):
+        p = self.p
+        chi = self.chi_array
+        r = (self.x3_array + a * self.x_array) % p
+        result = np.empty(p, dtype=np.int64)
+        step = max(1, self.chunk // p)
+        for start in range(0, p, step):
+            b = np.arange(start, min(start + step, p), dtype=np.int64)
+            result[start:start + len(b)] = chi[(r[None, :] + b[:, None]) % p].sum(axis=1, dtype=np.int64)
+        return result + p + 1
 
 
 def test(p, a, b):
@@ -42,19 +78,167 @@ def test(p, a, b):
 
 
 def gen_curves(p):
+    # (a, b) -> (s^2 a, s^3 b) is an isomorphism for square s and a
+    # quadratic twist otherwise, so one curve per orbit of squares is
+    # counted and its twist takes the order 2p + 2 - N for free.
+    squares = sorted({s * s % p for s in range(1, p)})
+    seen_a = bytearray(p)
+    counter = PointCounter(p)
     for a in range(p):
+        if seen_a[a]:
+            continue
+        for s in squares:
+            seen_a[s * s * a % p] = 1
+        # Only the squares fixing a still act on b.
+        stabilizer = [s for s in squares if s * s * a % p == a]
+        seen_b = bytearray(p)
+        row = None
         for b in range(p):
-            if test(p, a, b):
-                params = curve_params(p, a, b)
-                if params is not None:
-                    g, n = params
-                    yield E(n, SolvableCurve(Zn(p), a, b)), g
+            if seen_b[b] or not test(p, a, b):
+                continue
+            if counter.vectorized and row is None:
+                row = counter.count_row(a)
+            n = counter.count(a, b) if row is None else int(row[b])
+            for rep, order in (b, n), (-b % p, 2 * p + 2 - n):
+                if seen_b[rep]:
+                    continue
+                for s in stabilizer:
+                    seen_b[s * s * s * rep % p] = 1
+                curve = SolvableCurve(Zn(p), a, rep)
+                g = first_point(curve, p)
+                if g is not None:
+                    yield E(order, curve), g
+
+
+def first_point(curve, p):
+    for x in range(p):
+        y = curve.solve_for_x(x)
+        if y is not None and y.y != 0:
+            return y
+    return None
+
+
+def hasse_bound(p):
+    return p + 1 + isqrt(4 * p)
+
+
+def best_curve(p):
+    mx = None
+    for curve in gen_curves(p):
+        if mx is None or curve[0].ord > mx[0].ord:
+            mx = curve
+            if mx[0].ord >= hasse_bound(p):
+                break
+    return mx
 
 
 def scan_primes(fro, to):
-    for p in sieve(to):
-        if p < fro:
-            continue
-        mx = max(gen_curves(p), default=None, key=lambda ab: ab[0].ord)
+    for p in primes_in(fro, to + 1):
+        mx = best_curve(p)
         if mx is not None:
             yield mx
+
+
+def scan_chunk(primes):
+    start = perf_counter()
+    found = [mx for mx in map(best_curve, primes) if mx is not None]
+    return getpid(), len(primes), perf_counter() - start, found
+
+
+# Chunks of primes are spread over a process pool; results stream back as
+# chunks finish, or in prime order when ordered is set.
+def parallel_scan_primes(fro, to, workers=None, chunk=4, ordered=False, report=False):
+    primes = list(primes_in(fro, to + 1))
+    stats = {}
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(scan_chunk, primes[i:i + chunk])
+                   for i in range(0, len(primes), chunk)]
+        try:
+            for future in futures if ordered else as_completed(futures):
+                pid, count, elapsed, found = future.result()
+                done, busy = stats.get(pid, (0, 0.0))
+                stats[pid] = done + count, busy + elapsed
+                yield from found
+        finally:
+            for future in futures:
+                future.cancel()
+            # Also reached when the consumer closes the generator early.
+            if report:
+                for pid, (done, busy) in sorted(stats.items()):
+                    print('worker {}: {} primes in {:.2f}s, {:.1f}/s'.format(
+                        pid, done, busy, done / busy if busy else 0.0), file=stderr)
+
+
+def random_point(curve: SolvableCurve, p: int) -> Point:
+    while True:
+        y = curve.solve_for_x(randrange(p))
+        if y is not None:
+            return y
+
+
+def twist(curve: SolvableCurve, p: int) -> SolvableCurve:
+    f = curve.field
+    d = 2
+    while f.pow(d, (p - 1) // 2) == 1:
+        d += 1
+    return SolvableCurve(f, f.mul(curve.a, d * d), f.mul(curve.b, d * d * d))
+
+
+def bsgs(group: E, point: Point, start: int, step: int, count: int) -> Optional[int]:
+    # Smallest k < count with (start + k step) point = O.
+    intern = group.curve.intern
+    m = isqrt(count) + 1
+    q = group.pow(point, step)
+    baby = {}
+    r = group.unit()
+    for j in range(m):
+        key = None if group.is_unit(r) else intern(r)
+        baby.setdefault(key, j)
+        r = group.mul(r, q)
+    giant = group.pow(q, m)
+    r = group.pow(point, start)
+    for i in range(m + 1):
+        # r = (start + i m step) point, so jq = -r ends the search.
+        key = None if group.is_unit(r) else intern(group.inv(r))
+        j = baby.get(key)
+        if j is not None and i * m + j < count:
+            return i * m + j
+        r = group.mul(r, giant)
+    return None
+
+
+def group_order(curve: SolvableCurve, tries: int = 64) -> int:
+    p = curve.field.order()
+    if p < 1000:
+        return PointCounter(p).count(curve.a, curve.b)
+    lo, hi = p + 1 - isqrt(4 * p), p + 1 + isqrt(4 * p)
+    # The order lies in [lo, hi] and is r modulo mod; points of the curve
+    # refine the progression directly and points of the twist through
+    # N' = 2p + 2 - N (Mestre), until a single candidate is left.
+    r, mod = 0, 1
+    curves = [(E(0, curve), 0), (E(0, twist(curve, p)), 2 * p + 2)]
+    for attempt in range(tries):
+        group, flip = curves[attempt % 2]
+        point = random_point(group.curve, p)
+        r_here = (flip - r) % mod if flip else r
+        start = lo + (r_here - lo) % mod
+        count = (hi - start) // mod + 1
+        k0 = bsgs(group, point, start, mod, count)
+        if k0 is None:
+            # Only a singular curve has no multiple of the point in range.
+            raise ValueError('no group order in the Hasse interval')
+        first = start + k0 * mod
+        k1 = bsgs(group, point, first + mod, mod, count - k0 - 1)
+        if k1 is None:
+            return flip - first if flip else first
+        mod = (k1 + 1) * mod
+        r = (flip - first) % mod if flip else first % mod
+    raise Exception()
+
+
+def point_order(group: E, point: Point) -> int:
+    order = group.order()
+    for q in prime_factors(order):
+        while order % q == 0 and group.is_unit(group.pow(point, order // q)):
+            order //= q
+    return order
@@ -1,3 +1,4 @@
+from binascii import b2a_base64
 from dataclasses import dataclass
 
 p = 2 ** 256 - 2 ** 224 + 2 ** 192 + 2 ** 96 - 1
@@ -110,15 +111,15 @@ def read_point(line: str):
         return Point(Zp(int(x)), Zp(int(y)), Zp(1))
 
 
-code = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_.'
+code = b'0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_.'
+standard = b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+from_standard = bytes.maketrans(standard, code)
 
 
 def encode(x: int):
-    res = ''
-    while x != 0:
-        res += code[x % 64]
-        x //= 64
-    return res
+    raw = x.to_bytes((x.bit_length() + 23) // 24 * 3, 'big')
+    res = b2a_base64(raw, newline=False).translate(from_standard)
+    return res[::-1].decode('ascii').rstrip('0')
 
 
 for _ in range(n):
@@ -0,0 +1,157 @@
+import sqlite3
+from sys import argv
+from typing import Iterable, Iterator, List, Optional, Tuple
+from elliptic_curve import E, Point, SolvableCurve
+from elliptic_curve_generator import best_curve
+from prime_fields import Zn
+from primes import primes_in
+
+# One row per parameter set, keyed by family and field size p^degree; rank
+# orders the rows of a family ("best"), data holds the rest as text. p and
+# rank outgrow SQLite's 64-bit INTEGER, so they are stored as keys.
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS params (
+    family TEXT NOT NULL,
+    p BLOB NOT NULL,
+    degree INTEGER NOT NULL,
+    rank BLOB,
+    data TEXT NOT NULL,
+    UNIQUE (family, p, degree, data)
+);
+CREATE INDEX IF NOT EXISTS params_range ON params (family, degree, p, rank);
+'''
+
+
+class ParamStore:
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def add(self, family: str, rows: Iterable[Tuple[int, int, Optional[int], str]]):
+        with self.db:
+            self.db.executemany(
+                'INSERT OR IGNORE INTO params (family, p, degree, rank, data) VALUES (?, ?, ?, ?, ?)',
+                ((family, key(p), degree, key(rank), data) for p, degree, rank, data in rows))
+
+    def query(self, family: str, lo: int, hi: int, degree: int = 1) -> List[Tuple[int, Optional[int], str]]:
+        rows = self.db.execute(
+            'SELECT p, rank, data FROM params WHERE family = ? AND degree = ? AND p BETWEEN ? AND ? '
+            'ORDER BY p, rank DESC', (family, degree, key(max(lo, 0)), key(hi))).fetchall()
+        return [from_row(row) for row in rows]
+
+    def best(self, family: str, lo: int, hi: int, degree: int = 1) -> Optional[Tuple[int, Optional[int], str]]:
+        row = self.db.execute(
+            'SELECT p, rank, data FROM params WHERE family = ? AND degree = ? AND p BETWEEN ? AND ? '
+            'ORDER BY rank DESC, p LIMIT 1', (family, degree, key(max(lo, 0)), key(hi))).fetchone()
+        return None if row is None else from_row(row)
+
+    def add_primes(self, rows: Iterable[Tuple[int, int]]):
+        self.add('prime', ((p, 1, None, str(g)) for p, g in rows))
+
+    def primes(self, lo: int, hi: int) -> List[Tuple[int, int]]:
+        return [(p, int(g)) for p, _, g in self.query('prime', lo, hi)]
+
+    def add_polys(self, rows: Iterable[Tuple[int, List[int], List[int]]]):
+        self.add('poly', ((p, len(modulo) - 1, None, spaced(modulo) + '|' + spaced(g))
+                          for p, modulo, g in rows))
+
+    def polys(self, lo: int, hi: int, degree: int) -> List[Tuple[int, List[int], List[int]]]:
+        result = []
+        for p, _, data in self.query('poly', lo, hi, degree):
+            modulo, g = data.split('|')
+            result.append((p, ints(modulo), ints(g)))
+        return result
+
+    def add_curves(self, curves: Iterable[Tuple[E, Point]]):
+        self.add('curve', ((e.curve.field.N, 1, e.ord, spaced([e.curve.a, e.curve.b, g.x, g.y]))
+                           for e, g in curves))
+
+    def best_curve(self, lo: int, hi: int) -> Optional[Tuple[E, Point]]:
+        row = self.best('curve', lo, hi)
+        return None if row is None else to_curve(*row)
+
+    def curves(self, lo: int, hi: int) -> List[Tuple[E, Point]]:
+        return [to_curve(*row) for row in self.query('curve', lo, hi)]
+
+    # Primes whose search is done are marked, so that a prime without any
+    # curve is not searched again either.
+    def scanned(self, lo: int, hi: int) -> set:
+        return {p for p, _, _ in self.query('scan', lo, hi)}
+
+    def scan_primes(self, fro: int, to: int) -> Iterator[Tuple[E, Point]]:
+        done = self.scanned(fro, to)
+        for p in primes_in(fro, to + 1):
+            if p in done:
+                mx = self.best_curve(p, p)
+            else:
+                mx = best_curve(p)
+                if mx is not None:
+                    self.add_curves([mx])
+                self.add('scan', [(p, 1, None, '')])
+            if mx is not None:
+                yield mx
+
+
+# A length byte before the big-endian digits makes BLOB order (memcmp)
+# agree with numeric order for non-negative numbers below 2^2040.
+def key(n: Optional[int]) -> Optional[bytes]:
+    if n is None:
+        return None
+    assert 0 <= n < 1 << 2040
+    raw = n.to_bytes((n.bit_length() + 7) // 8, 'big')
+    return bytes([len(raw)]) + raw
+
+
+def unkey(k: Optional[bytes]) -> Optional[int]:
+    return None if k is None else int.from_bytes(k[1:], 'big')
+
+
+def from_row(row: Tuple[bytes, Optional[bytes], str]) -> Tuple[int, Optional[int], str]:
+    p, rank, data = row
+    return unkey(p), unkey(rank), data
+
+
+def to_curve(p: int, order: int, data: str) -> Tuple[E, Point]:
+    a, b, gx, gy = ints(data)
+    curve = SolvableCurve(Zn(p), a, b)
+    return E(order, curve), curve.point(gx, gy)
+
+
+def spaced(xs: Iterable[int]) -> str:
+    return ' '.join(map(str, xs))
+
+
+def ints(line: str) -> List[int]:
+    return [int(x) for x in line.split()]
+
+
+def read_primes(lines: Iterable[str]) -> Iterator[Tuple[int, int]]:
+    for line in lines:
+        if line.strip():
+            p, g = ints(line)
+            yield p, g
+
+
+def read_polys(lines: Iterable[str]) -> Iterator[Tuple[int, List[int], List[int]]]:
+    block = []
+    for line in list(lines) + ['']:
+        if line.strip():
+            block.append(ints(line))
+        elif block:
+            (p,), modulo, g = block
+            yield p, modulo, g
+            block = []
+
+
+if __name__ == '__main__':
+    store = ParamStore(argv[1])
+    for path in argv[3:]:
+        with open(path) as f:
+            if argv[2] == 'primes':
+                store.add_primes(read_primes(f))
+            elif argv[2] == 'polys':
+                store.add_polys(read_polys(f))
+    store.close()
@@ -1,4 +1,5 @@
 import sys
+from binascii import a2b_base64, b2a_base64
 from typing import Generic, List, Optional, Tuple, TypeVar
 from random import randrange
 
@@ -83,9 +84,24 @@ class SqrtField(Field[T]):
 
 
 class Fp(GcdMixin[List[T]]):
+    frobenius_window = 4
+
     def __init__(self, over: Field[T], modulo: List[T]):
         self.over = over
         self.modulo = modulo
+        # Below window-sized p the subset tables cost more than they save.
+        self.use_frobenius = over.order().bit_length() >= self.frobenius_window
+        if self.use_frobenius:
+            self._init_frobenius()
+
+    def _init_frobenius(self):
+        over, n = self.over, len(self.modulo) - 1
+        xp = super().pow(self.into([0, 1]), over.order())
+        rows = [self.unit()]
+        for _ in range(n - 1):
+            rows.append(self.mul(rows[-1], xp))
+        rows = [r + [over.zero()] * (n - len(r)) for r in rows]
+        self.frobenius_columns = [list(col) for col in zip(*rows)]
 
     def print(self, msg, x):
         print(msg + ':', *x, file=sys.stderr)
@@ -109,11 +125,56 @@ class Fp(GcdMixin[List[T]]):
     def unit(self):
         return [self.over.unit()]
 
+    def frobenius(self, x):
+        return self.trim([self.over.into(sum(xx * c for xx, c in zip(x, col)))
+                          for col in self.frobenius_columns])
+
+    def pow(self, x, ord):
+        if not self.use_frobenius:
+            return super().pow(x, ord)
+        p = self.over.order()
+        digits = []
+        while ord != 0:
+            digits.append(ord % p)
+            ord //= p
+        conjugates = [x]
+        for _ in digits[1:]:
+            conjugates.append(self.frobenius(conjugates[-1]))
+        w = self.frobenius_window
+        tables = [self.subset_products(conjugates[i:i + w])
+                  for i in range(0, len(conjugates), w)]
+        result = self.unit()
+        for bit in reversed(range(max(digits, default=0).bit_length())):
+            result = self.mul(result, result)
+            for i, table in enumerate(tables):
+                index = 0
+                for k, d in enumerate(digits[i * w:(i + 1) * w]):
+                    index |= ((d >> bit) & 1) << k
+                if index != 0:
+                    result = self.mul(result, table[index])
+        return result
+
+    def subset_products(self, xs):
+        table = [self.unit()]
+        for x in xs:
+            table += [self.mul(t, x) for t in table]
+        return table
+
     def inv(self, x):
-        gcd, x, _ = self.gcd(x, self.modulo)
-        assert len(gcd) == 1
-        k = self.over.inv(gcd[0])
-        return self.trim([self.over.mul(xx, k) for xx in x])
+        if not self.use_frobenius:
+            gcd, x, _ = self.gcd(x, self.modulo)
+            assert len(gcd) == 1
+            k = self.over.inv(gcd[0])
+            return self.trim([self.over.mul(xx, k) for xx in x])
+        conjugate = x
+        rest = self.unit()
+        for _ in range(len(self.modulo) - 2):
+            conjugate = self.frobenius(conjugate)
+            rest = self.mul(rest, conjugate)
+        norm = self.trim(self.mul(x, rest))
+        assert len(norm) == 1
+        k = self.over.inv(norm[0])
+        return self.trim([self.over.mul(xx, k) for xx in rest])
 
     def add(self, x, y):
         x = x + [self.over.zero()] * (len(y) - len(x))
@@ -227,58 +288,76 @@ def align(lst, length):
     return lst + [0] * (length - len(lst))
 
 
-def dec_char(number):
-    if 0 <= number <= 9:
-        return chr(48 + number)
-    if 10 <= number <= 35:
-        return chr(55 + number)
-    if 36 <= number <= 61:
-        return chr(61 + number)
-    if number == 62:
-        return ' '
-    if number == 63:
-        return '.'
-    raise Exception()
-
-
-def enc_char(ch):
-    symbol = ord(ch)
-    if 48 <= symbol <= 57:
-        return symbol - 48
-    if 65 <= symbol <= 90:
-        return symbol - 55
-    if 97 <= symbol <= 122:
-        return symbol - 61
-    if symbol == 32:
-        return 62
-    if symbol == 46:
-        return 63
-    raise Exception()
-
-
 class BaseEncoder(Encoder[int]):
     def __init__(self, base: int):
         self.base = base
 
     def encode(self, text):
-        bigint = 0
-        for c in reversed(text):
-            bigint = bigint * 64 + enc_char(c)
-        result = []
-        while bigint != 0:
-            result.append(bigint % self.base)
-            bigint //= self.base
-        return result
+        bigint = pack64(text)
+        return to_digits(bigint, self.base)
 
     def decode(self, code):
-        bigint = 0
-        for c in reversed(code):
-            bigint = bigint * self.base + c
-        result = ''
-        while bigint != 0:
-            result += dec_char(bigint % 64)
-            bigint //= 64
-        return result
+        bigint = from_digits(code, self.base)
+        return unpack64(bigint)
+
+
+ALPHABET = b'0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz .'
+STANDARD = b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+TO_STANDARD = bytes.maketrans(ALPHABET, STANDARD)
+FROM_STANDARD = bytes.maketrans(STANDARD, ALPHABET)
+
+
+def pack64(text):
+    # Reversed, the text is the big-endian bit string of standard base64.
+    raw = text.encode('ascii')[::-1]
+    if raw.translate(None, ALPHABET):
+        raise Exception()
+    raw = b'0' * (-len(raw) % 4) + raw
+    return int.from_bytes(a2b_base64(raw.translate(TO_STANDARD)), 'big')
+
+
+def unpack64(code):
+    raw = code.to_bytes((code.bit_length() + 23) // 24 * 3, 'big')
+    text = b2a_base64(raw, newline=False).translate(FROM_STANDARD)
+    return text[::-1].decode('ascii').rstrip('0')
+
+
+def power_tree(base, n):
+    powers = [base]
+    while powers[-1] * powers[-1] <= n:
+        powers.append(powers[-1] * powers[-1])
+    return powers
+
+
+def to_digits(n, base):
+    # Little-endian digits of n, split in halves by base^(2^k).
+    if n == 0:
+        return []
+    result = []
+    powers = power_tree(base, n)
+    split_digits(n, powers, len(powers) - 1, result)
+    while result[-1] == 0:
+        result.pop()
+    return result
+
+
+def split_digits(n, powers, k, result):
+    if k < 0:
+        result.append(n)
+        return
+    high, low = divmod(n, powers[k])
+    split_digits(low, powers, k - 1, result)
+    split_digits(high, powers, k - 1, result)
+
+
+def from_digits(digits, base):
+    level, power = list(digits), base
+    while len(level) > 1:
+        if len(level) % 2 == 1:
+            level.append(0)
+        level = [low + high * power for low, high in zip(level[::2], level[1::2])]
+        power *= power
+    return level[0] if level else 0
 
 
 class Zn(SqrtField[int]):
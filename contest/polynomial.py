@@ -1,46 +1,202 @@
-from typing import List, TypeVar
-from algebra_base import Field, GcdMixin
+from dataclasses import dataclass
+from operator import mul
+from random import randrange
+from typing import List, Sequence, TypeVar, Union
+from algebra_base import Field, GcdMixin, SqrtField
+from encoders import Encoder
+from prime_fields import Zn
+from primes import prime_factors
 
 T = TypeVar('T')
 
 
-class Fp(GcdMixin[List[T]]):
+class Poly(tuple):
+    _hash = None
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = tuple.__hash__(self)
+        return self._hash
+
+
+class Fp(GcdMixin[Poly], SqrtField[Poly]):
+    karatsuba_threshold = 32
+    toom3_threshold = 192
+    sparse_terms = 4
+    frobenius_window = 4
+    hgcd_threshold = 48
+
     def __init__(self, over: Field[T], modulo: List[T]):
         self.over = over
         self.modulo = modulo
+        self._init_reduction()
+        two = over.add(over.unit(), over.unit())
+        three = over.add(two, over.unit())
+        if over.is_zero(two) or over.is_zero(three):
+            self.toom3_consts = None
+        else:
+            self.toom3_consts = over.inv(two), over.inv(three)
+        # The Frobenius matrix costs n products, so it is built on first use.
+        # Below window-sized p the subset tables cost more than they save.
+        self.use_frobenius = self.lazy and over.order().bit_length() >= self.frobenius_window
+        self.frobenius_columns = None
+        self.non_residue = None
+
+    def _init_reduction(self):
+        over, n = self.over, len(self.modulo) - 1
+        # Integer coefficients can be accumulated unreduced and taken
+        # modulo p once at the end.
+        self.lazy = isinstance(over, Zn)
+        self.lead_inv = over.inv(self.modulo[-1])
+        # x^n = tail(x) modulo the modulus.
+        tail = [over.neg(over.mul(c, self.lead_inv)) for c in self.modulo[:-1]]
+        terms = [(j, c) for j, c in enumerate(tail) if not over.is_zero(c)]
+        self.sparse = terms if len(terms) <= self.sparse_terms else None
+        rows = [tail]
+        for _ in range(n - 2):
+            row = [over.zero()] + rows[-1]
+            top = row.pop()
+            rows.append([over.add(r, over.mul(top, t)) for r, t in zip(row, tail)])
+        # Column j holds the x^j coefficients of x^n, ..., x^(2n - 2).
+        self.reduction_columns = [list(col) for col in zip(*rows)]
+
+    def _init_frobenius(self):
+        n = len(self.modulo) - 1
+        xp, base, e = self.unit(), self.into([0, 1]), self.over.order()
+        while e != 0:
+            if e % 2 == 1:
+                xp = self.mul(xp, base)
+            base = self.mul(base, base)
+            e //= 2
+        rows = [self.unit()]
+        for _ in range(n - 1):
+            rows.append(self.mul(rows[-1], xp))
+        rows = [list(r) + [self.over.zero()] * (n - len(r)) for r in rows]
+        # Column j holds the x^j coefficients of (x^i)^p for i < n.
+        return [list(col) for col in zip(*rows)]
 
     def order(self):
         return self.over.order() ** (len(self.modulo) - 1)
 
     def into(self, x):
-        return self.trim([self.over.into(x) for x in x])
+        return self._mod([self.over.into(xx) for xx in x])
+
+    def pack(self, x: List[T]) -> Poly:
+        return self.into(x)
+
+    def unpack(self, x: Poly) -> List[T]:
+        return list(x)
+
+    def frobenius(self, x: Poly) -> Poly:
+        if self.frobenius_columns is None:
+            self.frobenius_columns = self._init_frobenius()
+        return self.trim([self.over.into(sum(map(mul, x, col)))
+                          for col in self.frobenius_columns])
+
+    def pow(self, x, ord):
+        if not self.use_frobenius:
+            return super().pow(x, ord)
+        elif ord < 0:
+            return self.pow(self.inv(x), -ord)
+        p = self.over.order()
+        digits = []
+        while ord != 0:
+            digits.append(ord % p)
+            ord //= p
+        # x^(sum d_k p^k) is the product of frobenius^k(x)^(d_k): one
+        # squaring chain of length log2(p) is shared by all the digits.
+        conjugates = [x]
+        for _ in digits[1:]:
+            conjugates.append(self.frobenius(conjugates[-1]))
+        w = self.frobenius_window
+        tables = [self._subset_products(conjugates[i:i + w])
+                  for i in range(0, len(conjugates), w)]
+        result = self.unit()
+        for bit in reversed(range(max(digits, default=0).bit_length())):
+            result = self.mul(result, result)
+            for i, table in enumerate(tables):
+                index = 0
+                for k, d in enumerate(digits[i * w:(i + 1) * w]):
+                    index |= ((d >> bit) & 1) << k
+                if index != 0:
+                    result = self.mul(result, table[index])
+        return result
+
+    def _subset_products(self, xs: List[Poly]) -> List[Poly]:
+        table = [self.unit()]
+        for x in xs:
+            table += [self.mul(t, x) for t in table]
+        return table
 
     def eq(self, x, y):
         return self.is_zero(self.trim(self.sub(x, y)))
 
     def mul(self, x, y):
-        z = [self.over.zero()] * (len(x) + len(y) - 1)
-        for i, x in enumerate(x):
-            for j, y in enumerate(y):
-                z[i + j] = self.over.add(z[i + j], self.over.mul(x, y))
-        return self._mod(x)
+        return self._mod(self._product(x, y))
 
     def unit(self):
-        return [self.over.unit()]
+        return Poly((self.over.unit(),))
 
     def inv(self, x):
+        if self.use_frobenius and (self.frobenius_columns is not None or
+                                   len(self.modulo) <= self.hgcd_threshold):
+            # Itoh-Tsujii: x^(r - 1) with r = 1 + p + ... + p^(n - 1) is a
+            # product of conjugates, and x^r is the norm in the base field.
+            conjugate = x
+            rest = self.unit()
+            for _ in range(len(self.modulo) - 2):
+                conjugate = self.frobenius(conjugate)
+                rest = self.mul(rest, conjugate)
+            norm = self.mul(x, rest)
+            if len(norm) == 1:
+                k = self.over.inv(norm[0])
+                return self.trim([self.over.mul(r, k) for r in rest])
         gcd, x, _ = self.gcd(x, self.modulo)
         assert len(gcd) == 1
         k = self.over.inv(gcd[0])
         return self.trim([self.over.mul(x, k) for x in x])
 
+    def sqrt(self, x):
+        if self.is_zero(x):
+            return x
+        q = self.order()
+        if q % 2 == 0:
+            return self.pow(x, q // 2)
+        if not self.eq(self.pow(x, (q - 1) // 2), self.unit()):
+            return None
+        # Tonelli-Shanks with q - 1 = 2^s t.
+        s, t = 0, q - 1
+        while t % 2 == 0:
+            s, t = s + 1, t // 2
+        c = self.pow(self._non_residue(), t)
+        root, rest = self.pow(x, (t + 1) // 2), self.pow(x, t)
+        while not self.eq(rest, self.unit()):
+            i, r = 0, rest
+            while not self.eq(r, self.unit()):
+                r = self.sqr(r)
+                i += 1
+            b = c
+            for _ in range(s - i - 1):
+                b = self.sqr(b)
+            s, c = i, self.sqr(b)
+            root, rest = self.mul(root, b), self.mul(rest, c)
+        return root
+
+    def _non_residue(self) -> Poly:
+        # Half of the nonzero elements qualify, but for even n all of the
+        # base field does, so the candidates are drawn at random.
+        p, n, half = self.over.order(), len(self.modulo) - 1, (self.order() - 1) // 2
+        while self.non_residue is None:
+            x = self.into([randrange(p) for _ in range(n)])
+            if not self.is_zero(x) and not self.eq(self.pow(x, half), self.unit()):
+                self.non_residue = x
+        return self.non_residue
+
     def add(self, x, y):
-        x += [self.over.zero()] * (len(y) - len(x))
-        y += [self.over.zero()] * (len(x) - len(y))
-        return self.trim([self.over.add(x, y) for x, y in zip(x, y)])
+        return self.trim(self._padd(x, y))
 
     def zero(self):
-        return []
+        return Poly()
 
     def is_zero(self, x):
         return len(x) == 0
@@ -48,31 +204,377 @@ class Fp(GcdMixin[List[T]]):
     def neg(self, x):
         return self.trim([self.over.neg(x) for x in x])
 
-    def _mod(self, x: List[T]) -> List[T]:
-        if len(x) < len(self.modulo):
-            return x
-        mk = self.over.inv(self.modulo[-1])
-        for i in range(len(x), len(self.modulo) - 1, -1):
-            k = self.over.mul(x[i], mk)
-            for j in range(len(self.modulo)):
+    def _mod(self, x: List[T]) -> Poly:
+        if not self.lazy:
+            return self._mod_long(x)
+        elif self.sparse is not None:
+            return self._mod_sparse(x)
+        elif len(x) <= 2 * len(self.modulo) - 3:
+            return self._mod_table(x)
+        else:
+            return self._mod_long(x)
+
+    def _mod_long(self, x: List[T]) -> Poly:
+        n = len(self.modulo) - 1
+        for i in reversed(range(n, len(x))):
+            k = self.over.mul(x[i], self.lead_inv)
+            for j in range(n + 1):
                 x[i - j] = self.over.sub(x[i - j],
-                                         self.over.mul(self.modulo[-j], k))
-        return self.trim(x)
+                                         self.over.mul(self.modulo[-j - 1], k))
+        return self.trim([self.over.into(xx) for xx in x[:n]])
+
+    def _mod_table(self, x: List[int]) -> Poly:
+        n = len(self.modulo) - 1
+        high = x[n:]
+        return self.trim([self.over.into(xx + sum(map(mul, high, col)))
+                          for xx, col in zip(x, self.reduction_columns)])
+
+    def _mod_sparse(self, x: List[int]) -> Poly:
+        n = len(self.modulo) - 1
+        for i in reversed(range(n, len(x))):
+            k = self.over.into(x[i])
+            if k != 0:
+                for j, c in self.sparse:
+                    x[i - n + j] += k * c
+        return self.trim([self.over.into(xx) for xx in x[:n]])
 
     def div(self, x, y):
+        return self._divmod(x, y)[0]
+
+    def _divmod(self, x: Sequence[T], y: Sequence[T]):
         if len(x) < len(y):
-            return []
+            return self.zero(), self.trim(x)
         mk = self.over.inv(y[-1])
         res = []
-        for i in range(len(x), len(y) - 1, -1):
+        x = list(x)
+        for i in reversed(range(len(y) - 1, len(x))):
             k = self.over.mul(x[i], mk)
             for j in range(len(y)):
-                x[i - j] = self.over.sub(x[i - j], self.over.mul(y[-j], k))
+                x[i - j] = self.over.sub(x[i - j], self.over.mul(y[-j - 1], k))
             res.append(k)
         res.reverse()
-        return self.trim(res)
+        return self.trim(res), self.trim(x[:len(y) - 1])
+
+    def gcd(self, x, y):
+        if min(len(x), len(y)) < self.hgcd_threshold:
+            return super().gcd(x, y)
+        x, y = self.trim(x), self.trim(y)
+        swap = len(x) < len(y)
+        if swap:
+            x, y = y, x
+        m = self._mat_identity()
+        while len(y) != 0:
+            if len(x) > len(y):
+                h = self._hgcd(x, y)
+                x, y = self._mat_apply(h, x, y)
+                m = self._mat_mul(h, m)
+                if len(y) == 0:
+                    break
+            q, r = self._divmod(x, y)
+            m = self._mat_step(q, m)
+            x, y = y, r
+        s, t = (m[1], m[0]) if swap else (m[0], m[1])
+        return x, s, t
+
+    def _hgcd(self, a: Sequence[T], b: Sequence[T]):
+        # Returns the matrix taking (a, b) to the pair of consecutive
+        # remainders whose degrees straddle half the degree of a.
+        m = len(a) // 2
+        if len(b) <= m:
+            return self._mat_identity()
+        elif len(a) < self.hgcd_threshold:
+            h = self._mat_identity()
+            while len(b) > m:
+                q, r = self._divmod(a, b)
+                h = self._mat_step(q, h)
+                a, b = b, r
+            return h
+        h = self._hgcd(a[m:], b[m:])
+        a, b = self._mat_apply(h, a, b)
+        if len(b) <= m:
+            return h
+        q, r = self._divmod(a, b)
+        h = self._mat_step(q, h)
+        a, b = b, r
+        k = 2 * m - (len(a) - 1)
+        return self._mat_mul(self._hgcd(a[k:], b[k:]), h)
+
+    def _mat_identity(self):
+        return self.unit(), self.zero(), self.zero(), self.unit()
+
+    def _mat_apply(self, m, a, b):
+        return (self.trim(self._padd(self._product(m[0], a), self._product(m[1], b))),
+                self.trim(self._padd(self._product(m[2], a), self._product(m[3], b))))
+
+    def _mat_step(self, q, m):
+        return (m[2], m[3],
+                self.trim(self._psub(m[0], self._product(q, m[2]))),
+                self.trim(self._psub(m[1], self._product(q, m[3]))))
+
+    def _mat_mul(self, s, r):
+        m00, m10 = self._mat_apply(s, r[0], r[2])
+        m01, m11 = self._mat_apply(s, r[1], r[3])
+        return m00, m01, m10, m11
+
+    def _product(self, x: Sequence[T], y: Sequence[T]) -> List[T]:
+        if len(x) == 0 or len(y) == 0:
+            return []
+        n = min(len(x), len(y))
+        if n < self.karatsuba_threshold:
+            return self._schoolbook(x, y)
+        elif n < self.toom3_threshold or self.toom3_consts is None:
+            return self._karatsuba(x, y)
+        else:
+            return self._toom3(x, y)
+
+    def _schoolbook(self, x: Sequence[T], y: Sequence[T]) -> List[T]:
+        z = [self.over.zero()] * (len(x) + len(y) - 1)
+        for i, xx in enumerate(x):
+            for j, yy in enumerate(y):
+                z[i + j] = self.over.add(z[i + j], self.over.mul(xx, yy))
+        return z
+
+    def _karatsuba(self, x: Sequence[T], y: Sequence[T]) -> List[T]:
+        m = max(len(x), len(y)) // 2
+        x0, x1 = x[:m], x[m:]
+        y0, y1 = y[:m], y[m:]
+        z0 = self._product(x0, y0)
+        z2 = self._product(x1, y1)
+        z1 = self._product(self._padd(x0, x1), self._padd(y0, y1))
+        z1 = self._psub(self._psub(z1, z0), z2)
+        return self._compose([z0, z1, z2], m, len(x) + len(y) - 1)
+
+    def _toom3(self, x: Sequence[T], y: Sequence[T]) -> List[T]:
+        # Evaluation at 0, 1, -1, -2, oo with Bodrato's interpolation.
+        half, third = self.toom3_consts
+        k = -(-max(len(x), len(y)) // 3)
+        x0, x1, x2 = x[:k], x[k:2 * k], x[2 * k:]
+        y0, y1, y2 = y[:k], y[k:2 * k], y[2 * k:]
+        xs, ys = self._padd(x0, x2), self._padd(y0, y2)
+        r0 = self._product(x0, y0)
+        r1 = self._product(self._padd(xs, x1), self._padd(ys, y1))
+        rm1 = self._product(self._psub(xs, x1), self._psub(ys, y1))
+        rm2 = self._product(self._toom3_at_minus_two(x0, x1, x2),
+                            self._toom3_at_minus_two(y0, y1, y2))
+        rinf = self._product(x2, y2)
+        r3 = self._pscale(self._psub(rm2, r1), third)
+        r1 = self._pscale(self._psub(r1, rm1), half)
+        r2 = self._psub(rm1, r0)
+        r3 = self._padd(self._pscale(self._psub(r2, r3), half),
+                        self._padd(rinf, rinf))
+        r2 = self._psub(self._padd(r2, r1), rinf)
+        r1 = self._psub(r1, r3)
+        return self._compose([r0, r1, r2, r3, rinf], k, len(x) + len(y) - 1)
+
+    def _toom3_at_minus_two(self, x0, x1, x2):
+        t = self._psub(x1, self._padd(x2, x2))
+        return self._psub(x0, self._padd(t, t))
+
+    def _compose(self, parts: List[Sequence[T]], shift: int, ln: int) -> List[T]:
+        z = [self.over.zero()] * (ln + len(parts) * shift)
+        for i, part in enumerate(parts):
+            for j, c in enumerate(part):
+                z[i * shift + j] = self.over.add(z[i * shift + j], c)
+        return z[:ln]
+
+    def _padd(self, x: Sequence[T], y: Sequence[T]) -> List[T]:
+        if len(x) < len(y):
+            x, y = y, x
+        return [self.over.add(a, b) for a, b in zip(x, y)] + list(x[len(y):])
+
+    def _psub(self, x: Sequence[T], y: Sequence[T]) -> List[T]:
+        return self._padd(x, [self.over.neg(c) for c in y])
+
+    def _pscale(self, x: Sequence[T], k: T) -> List[T]:
+        return [self.over.mul(c, k) for c in x]
+
+    def trim(self, x: Sequence[T]) -> Poly:
+        n = len(x)
+        while n > 0 and self.over.is_zero(x[n - 1]):
+            n -= 1
+        if isinstance(x, Poly) and n == len(x):
+            return x
+        return Poly(x[:n])
+
+
+class PackedFp(Field[int]):
+    def __init__(self, over: Zn, modulo: List[int]):
+        self.poly = Fp(over, modulo)
+        self.over = over
+        self.modulo = modulo
+        # A slot must hold a full coefficient of the unreduced product.
+        bound = max(len(modulo) - 1, 1) * (over.order() - 1) ** 2
+        self.width = (bound.bit_length() + 7) // 8
+
+    def pack(self, x: List[int]) -> int:
+        return self._pack(self.poly.into(x))
+
+    def _pack(self, x: List[int]) -> int:
+        slots = (c.to_bytes(self.width, 'little') for c in x)
+        return int.from_bytes(b''.join(slots), 'little')
+
+    def unpack(self, x: int) -> List[int]:
+        w = self.width
+        ln = -(-x.bit_length() // (8 * w)) * w
+        bits = x.to_bytes(ln, 'little')
+        return [int.from_bytes(bits[i:i + w], 'little') for i in range(0, ln, w)]
+
+    def order(self):
+        return self.poly.order()
+
+    def into(self, x):
+        return self.pack(self.unpack(x))
+
+    def eq(self, x, y):
+        return x == y
+
+    def mul(self, x, y):
+        return self._pack(self.poly._mod(self.unpack(x * y)))
+
+    def unit(self):
+        return 1
+
+    def inv(self, x):
+        return self._pack(self.poly.inv(self.unpack(x)))
 
-    def trim(self, x: List[T]) -> List[T]:
-        while self.over.is_zero(x[-1]):
-            x.pop()
+    def add(self, x, y):
+        return self._pack(self.poly.add(self.unpack(x), self.unpack(y)))
+
+    def zero(self):
+        return 0
+
+    def is_zero(self, x):
+        return x == 0
+
+    def neg(self, x):
+        return self._pack(self.poly.neg(self.unpack(x)))
+
+
+class FpTable(SqrtField[int]):
+    max_order = 1 << 17
+
+    def __init__(self, over: Zn, modulo: List[int]):
+        self.poly = Fp(over, modulo)
+        self.over = over
+        self.modulo = modulo
+        self.p = over.order()
+        self.m = self.poly.order() - 1
+        self.zero_log = self.m
+        self.half = self.m // 2 if self.p % 2 == 1 else 0
+        g = self._primitive()
+        # Elements are logarithms to the base g, with m standing for zero;
+        # antilog holds each power of g as its base-p index.
+        self.antilog = [0] * self.m
+        self.log = [self.zero_log] * (self.m + 1)
+        x = self.poly.unit()
+        for i in range(self.m):
+            index = self._index(x)
+            self.antilog[i] = index
+            self.log[index] = i
+            x = self.poly.mul(x, g)
+        # Only a primitive g reaches every nonzero element.
+        assert self.log.count(self.zero_log) == 1
+        # g^zech[n] = 1 + g^n
+        self.zech = [self.log[a - a % self.p + (a + 1) % self.p]
+                     for a in self.antilog]
+
+    def _index(self, x: List[int]) -> int:
+        index = 0
+        for c in reversed(x):
+            index = index * self.p + c
+        return index
+
+    def _primitive(self) -> List[int]:
+        factors = prime_factors(self.m)
+        for index in range(1, self.m + 1):
+            g = self.unpack_index(index)
+            if all(not self.poly.eq(self.poly.pow(g, self.m // q), self.poly.unit())
+                   for q in factors):
+                return g
+        raise Exception()
+
+    def unpack_index(self, index: int) -> List[int]:
+        x = []
+        while index != 0:
+            x.append(index % self.p)
+            index //= self.p
         return x
+
+    def pack(self, x: List[int]) -> int:
+        return self.log[self._index(self.poly.into(x))]
+
+    def unpack(self, x: int) -> List[int]:
+        if x == self.zero_log:
+            return []
+        return self.unpack_index(self.antilog[x])
+
+    def order(self):
+        return self.m + 1
+
+    def eq(self, x, y):
+        return x == y
+
+    def mul(self, x, y):
+        if x == self.zero_log or y == self.zero_log:
+            return self.zero_log
+        return (x + y) % self.m
+
+    def unit(self):
+        return 0
+
+    def inv(self, x):
+        assert x != self.zero_log
+        return -x % self.m
+
+    def pow(self, x, ord):
+        if x == self.zero_log:
+            return self.unit() if ord == 0 else self.zero_log
+        return x * ord % self.m
+
+    def sqrt(self, x):
+        if x == self.zero_log:
+            return x
+        elif self.m % 2 == 1:
+            return x * (self.m + 1) // 2 % self.m
+        elif x % 2 == 1:
+            return None
+        return x // 2
+
+    def add(self, x, y):
+        if x == self.zero_log:
+            return y
+        elif y == self.zero_log:
+            return x
+        z = self.zech[(y - x) % self.m]
+        if z == self.zero_log:
+            return self.zero_log
+        return (x + z) % self.m
+
+    def zero(self):
+        return self.zero_log
+
+    def is_zero(self, x):
+        return x == self.zero_log
+
+    def neg(self, x):
+        if x == self.zero_log:
+            return x
+        return (x + self.half) % self.m
+
+
+def fast_field(over: Zn, modulo: List[int], fallback: type = PackedFp) -> Field:
+    if over.order() ** (len(modulo) - 1) <= FpTable.max_order:
+        return FpTable(over, modulo)
+    return fallback(over, modulo)
+
+
+@dataclass
+class PackedEncoder(Encoder[int]):
+    lists: Encoder[List[int]]
+    field: Union[PackedFp, FpTable]
+
+    def encode(self, text):
+        return [self.field.pack(x) for x in self.lists.encode(text)]
+
+    def decode(self, code):
+        return self.lists.decode([self.field.unpack(c) for c in code])
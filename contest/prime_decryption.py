@@ -1,8 +1,50 @@
 import sys
 
+# A table entry costs about a tenth of a pow, so building the whole table
+# pays off once there are at least p / TABLE_RATIO lines.
+TABLE_RATIO = 8
+
 def decrypt(c1, c2):
     return c2 * pow(c1, -k, p) % p
 
+def decrypt_table(table, c1, c2):
+    if c1 % p == 0:
+        raise ValueError('c1 is not invertible')
+    return c2 * table[c1 % p] % p
+
+def prime_factors(n):
+    result = []
+    d = 2
+    while d * d <= n:
+        if n % d == 0:
+            result.append(d)
+            while n % d == 0:
+                n //= d
+        d += 1
+    if n > 1:
+        result.append(n)
+    return result
+
+def primitive_root(p):
+    factors = prime_factors(p - 1)
+    for g in range(1, p):
+        if all(pow(g, (p - 1) // q, p) != 1 for q in factors):
+            return g
+    raise Exception()
+
+def inverse_powers(p, k):
+    # Walks g^i together with g^(-ki), so x^(-k) for every x in [1, p)
+    # costs two multiplications instead of one exponentiation.
+    g = primitive_root(p)
+    step = pow(g, -k, p)
+    table = [0] * p
+    x, y = 1, 1
+    for _ in range(p - 1):
+        table[x] = y
+        x = x * g % p
+        y = y * step % p
+    return table
+
 def decode(ms):
     num = 0
     for m in reversed(ms):
@@ -27,5 +69,10 @@ def dec_char(number):
     raise Exception()
 
 p, k = map(int, input().split(' '))
-print(decode([decrypt(*map(int, line.split(' ')))
-      for line in sys.stdin.readlines()]))
+lines = sys.stdin.readlines()
+if p <= TABLE_RATIO * len(lines):
+    table = inverse_powers(p, k)
+    ms = [decrypt_table(table, *map(int, line.split(' '))) for line in lines]
+else:
+    ms = [decrypt(*map(int, line.split(' '))) for line in lines]
+print(decode(ms))
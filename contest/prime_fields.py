@@ -33,12 +33,52 @@ class Zn(SqrtField[int]):
         return 0
 
     def neg(self, x):
-        return self.N - x % self.N
+        return -x % self.N
+
+    def jacobi(self, x):
+        a, n, result = x % self.N, self.N, 1
+        while a != 0:
+            shift = (a & -a).bit_length() - 1
+            a >>= shift
+            if shift % 2 == 1 and n % 8 in (3, 5):
+                result = -result
+            a, n = n, a
+            if a % 4 == 3 and n % 4 == 3:
+                result = -result
+            a %= n
+        return result if n == 1 else 0
 
     def sqrt(self, x):
-        assert self.N % 4 == 3
-        sqrt = self.pow(x, (self.N + 1) // 4)
-        if self.into(sqrt ** 2) == self.into(x):
+        x = self.into(x)
+        if x == 0 or self.N == 2:
+            return x
+        if self.N % 4 == 3:
+            sqrt = self.pow(x, (self.N + 1) // 4)
+        elif self.jacobi(x) == 1:
+            sqrt = self._tonelli_shanks(x)
+        else:
+            return None
+        if self.into(sqrt ** 2) == x:
             return sqrt
         else:
             return None
+
+    def _tonelli_shanks(self, x):
+        # N - 1 = 2^s t, with c generating the 2-Sylow subgroup.
+        N, s, t = self.N, 0, self.N - 1
+        while t % 2 == 0:
+            s, t = s + 1, t // 2
+        z = 2
+        while self.jacobi(z) != -1:
+            z += 1
+        c = self.pow(z, t)
+        root, rest = self.pow(x, (t + 1) // 2), self.pow(x, t)
+        while rest != 1:
+            i, r = 0, rest
+            while r != 1:
+                r = r * r % N
+                i += 1
+            b = self.pow(c, 1 << (s - i - 1))
+            s, c = i, b * b % N
+            root, rest = root * b % N, rest * c % N
+        return root
@@ -0,0 +1,88 @@
+from itertools import compress
+from math import isqrt
+from typing import Iterator, List
+
+# Strong-pseudoprime bases that make Miller-Rabin exact below 3.3 * 10^24.
+WITNESSES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37]
+
+
+def is_prime(n: int) -> bool:
+    if n < 2:
+        return False
+    for p in WITNESSES:
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d, s = d // 2, s + 1
+    for a in WITNESSES:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def small_primes(n: int) -> List[int]:
+    if n < 2:
+        return []
+    # Index i stands for the odd number 2i + 3.
+    odd = bytearray([1]) * ((n - 1) // 2)
+    for i in range((isqrt(n) - 1) // 2):
+        if odd[i]:
+            p = 2 * i + 3
+            start = (p * p - 3) // 2
+            odd[start::p] = bytes((len(odd) - 1 - start) // p + 1)
+    return [2] + list(compress(range(3, n + 1, 2), odd))
+
+
+def primes_in(fro: int, to: int, segment: int = 1 << 16) -> Iterator[int]:
+    fro = max(fro, 2)
+    if fro >= to:
+        return
+    if fro <= 2:
+        yield 2
+    lo = max(fro | 1, 3)
+    # Sieving needs every prime below sqrt(to); for a narrow window high up
+    # testing the odd candidates one by one is cheaper.
+    if isqrt(to) > max(to - fro, 1 << 20):
+        yield from (n for n in range(lo, to, 2) if is_prime(n))
+        return
+    base = small_primes(isqrt(to - 1))[1:]
+    while lo < to:
+        hi = min(lo + 2 * segment, to)
+        size = (hi - lo + 1) // 2
+        # Index i stands for the odd number lo + 2i.
+        odd = bytearray([1]) * size
+        for p in base:
+            if p * p >= hi:
+                break
+            start = max(p * p, (lo + p - 1) // p * p)
+            if start % 2 == 0:
+                start += p
+            i = (start - lo) // 2
+            if i < size:
+                odd[i::p] = bytes((size - 1 - i) // p + 1)
+        yield from compress(range(lo, hi, 2), odd)
+        lo = hi
+
+
+def prime_factors(n: int) -> List[int]:
+    # Distinct prime factors in increasing order; trial division stops as
+    # soon as the cofactor is prime.
+    result = []
+    d = 2
+    while n > 1 and not is_prime(n):
+        while n % d != 0:
+            d += 1 if d == 2 else 2
+        result.append(d)
+        while n % d == 0:
+            n //= d
+    if n > 1:
+        result.append(n)
+    return result
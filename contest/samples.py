@@ -1,17 +1,41 @@
 from gamal import ElGamal
-from elliptic_curve import SolvableCurve, E, Point, PointEncoder
+from elliptic_curve import SolvableCurve, E, Point, RandomEncoder, CoefficientEncoder
 from prime_fields import Zn
-from encoders import ChunkEncoder, ListEncoder
-from polynomial import Fp
-from typing import List
+from encoders import Base64, BaseEncoder, ChunkEncoder, ListEncoder
+from polynomial import Fp, FpTable, PackedFp, PackedEncoder
+from typing import List, Union
 from bitsize import BinaryPoly
+from binary_curve import BinaryE, BinaryRandomEncoder
 
 
 def elliptic_el_gamal(group: E, generator: Point) -> ElGamal[Point]:
     field_order = group.curve.field.order()
     rand_shift = _rand_shift_from_field_order(field_order)
     chunk_length = _chunk_length_from_field_order(field_order)
-    encoder = PointEncoder(ChunkEncoder(chunk_length), group.curve, rand_shift)
+    encoder = RandomEncoder(ChunkEncoder(chunk_length), group.curve, rand_shift)
+    return ElGamal(group, generator, encoder)
+
+
+def extension_elliptic_el_gamal(group: E, generator: Point) -> ElGamal[Point]:
+    field = group.curve.field
+    p, n = field.over.order(), len(field.modulo) - 1
+    rand_len = _rand_len_from_extension(p, n)
+    lists = ListEncoder(BaseEncoder(p, Base64()), n - rand_len)
+    return ElGamal(group, generator, CoefficientEncoder(lists, group.curve, rand_len))
+
+
+def _rand_len_from_extension(p: int, n: int) -> int:
+    rand_len = 1
+    while p ** rand_len < 64 and rand_len < n - 1:
+        rand_len += 1
+    return rand_len
+
+
+def binary_elliptic_el_gamal(group: BinaryE, generator: Point) -> ElGamal[Point]:
+    field_order = group.curve.field.order()
+    rand_shift = _rand_shift_from_field_order(field_order)
+    chunk_length = _chunk_length_from_field_order(field_order)
+    encoder = BinaryRandomEncoder(ChunkEncoder(chunk_length), group.curve, rand_shift)
     return ElGamal(group, generator, encoder)
 
 
@@ -39,6 +63,15 @@ def polynomial_el_gamal(group: Fp, generator: List[int]) -> ElGamal[List[int]]:
     return ElGamal(group, generator, ListEncoder(primary, list_length))
 
 
+def packed_polynomial_el_gamal(group: Union[PackedFp, FpTable],
+                               generator: List[int]) -> ElGamal[int]:
+    chunk_length = _chunk_length_from_group_order(group.over.order())
+    primary = ChunkEncoder(chunk_length)
+    list_length = _list_length_from_modulo_len(len(group.modulo))
+    encoder = PackedEncoder(ListEncoder(primary, list_length), group)
+    return ElGamal(group, group.pack(generator), encoder)
+
+
 def _list_length_from_modulo_len(ln: int) -> int:
     return ln - 1
 